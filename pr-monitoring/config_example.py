@@ -3,8 +3,8 @@ Example configuration for PR Monitoring System
 Copy this to config.py and customize for your organization
 """
 import os
-from typing import List
-import pytz
+from typing import FrozenSet
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,10 +25,10 @@ class Config:
     WORK_END_HOUR: int = int(os.getenv('WORK_END_HOUR', '17'))
     
     # User Filtering - add users to exclude from reports
-    EXCLUSION_LIST: List[str] = [
+    EXCLUSION_LIST: FrozenSet[str] = frozenset(
         item.strip() for item in os.getenv('EXCLUSION_LIST', '').split(',')
         if item.strip()
-    ]
+    )
     
     # Email filtering (optional)
     EMAIL_PREFIX_FILTER: str = os.getenv('EMAIL_PREFIX_FILTER', '')
@@ -54,8 +54,8 @@ class Config:
         
         # Validate timezone
         try:
-            pytz.timezone(cls.PROJECT_TIMEZONE)
-        except pytz.exceptions.UnknownTimeZoneError:
+            ZoneInfo(cls.PROJECT_TIMEZONE)
+        except (ZoneInfoNotFoundError, ValueError):
             print(f"❌ Unknown timezone: {cls.PROJECT_TIMEZONE}")
             return False
         
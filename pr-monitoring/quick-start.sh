@@ -29,7 +29,7 @@ else
     echo "⚠️  uv not found, using pip..."
     python -m venv .venv
     source .venv/bin/activate
-    pip install requests python-dotenv pytz
+    pip install requests python-dotenv
     echo "✅ Dependencies installed with pip"
 fi
 
@@ -71,7 +71,7 @@ def main():
         print("💡 Alternatively, use pip:")
         print("   python -m venv .venv")
         print("   source .venv/bin/activate")
-        print("   pip install requests python-dotenv pytz")
+        print("   pip install requests python-dotenv")
         sys.exit(1)
     
     if not setup_environment():
@@ -3,14 +3,10 @@ Main application for PR Monitoring System
 """
 import logging
 import argparse
-from datetime import datetime, date, timedelta
-from typing import List, Dict
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Dict, Iterator
 
-from pr_monitoring.config import Config
-from pr_monitoring.database import Database
-from pr_monitoring.github_api import GitHubAPIClient
-from pr_monitoring.analysis import PRAnalyzer, UserFilter, ActivityState
-from pr_monitoring.reports import ReportGenerator
+from pr_monitoring.analysis import STATE_LABELS, dates_in_range
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +19,14 @@ class PRMonitoringSystem:
     """Main PR Monitoring System"""
     
     def __init__(self):
+        # Deferred so that the CLI can parse and reject arguments without loading
+        # configuration, sqlite3 or the HTTP stack
+        from pr_monitoring.config import Config
+        from pr_monitoring.database import Database
+        from pr_monitoring.github_api import GitHubAPIClient
+        from pr_monitoring.analysis import PRAnalyzer, UserFilter
+        from pr_monitoring.reports import ReportGenerator
+        
         # Validate configuration
         errors = Config.validate()
         if errors:
@@ -31,7 +35,7 @@ class PRMonitoringSystem:
             raise ValueError("Configuration validation failed")
         
         self.config = Config
-        self.database = Database(Config.DATABASE_PATH)
+        self.database = Database(Config.DATABASE_PATH, tune=Config.SQLITE_TUNE)
         self.github_client = GitHubAPIClient(Config.GITHUB_TOKEN)
         self.analyzer = PRAnalyzer(
             Config.get_timezone(), 
@@ -51,24 +55,15 @@ class PRMonitoringSystem:
             self.config.GITHUB_TEAM
         )
         
-        included_count = 0
-        excluded_count = 0
+        # Filter and store users in a single transaction
+        user_rows = [
+            (user['login'], user['email'], user['name'], self.user_filter.should_include_user(user))
+            for user in raw_users
+        ]
+        self.database.upsert_users(user_rows)
         
-        # Filter and store users
-        for user in raw_users:
-            included = self.user_filter.should_include_user(user)
-            
-            self.database.upsert_user(
-                login=user['login'],
-                email=user['email'],
-                name=user['name'],
-                included=included
-            )
-            
-            if included:
-                included_count += 1
-            else:
-                excluded_count += 1
+        included_count = sum(included for _, _, _, included in user_rows)
+        excluded_count = len(user_rows) - included_count
         
         logger.info(f"Processed {len(raw_users)} users: {included_count} included, {excluded_count} excluded")
         
@@ -80,13 +75,30 @@ class PRMonitoringSystem:
             'email_prefix_filter': self.config.EMAIL_PREFIX_FILTER
         }
     
-    def fetch_and_cache_pull_requests(self, start_date: date, end_date: date):
-        """Fetch pull requests with intelligent caching"""
+    def fetch_and_cache_pull_requests(self, start_date: date, end_date: date, incremental: bool = False):
+        """
+        Fetch pull requests with intelligent caching
+        In incremental mode, dates already fully fetched by a previous run are skipped
+        even when they have no cached PRs
+        """
         users = self.database.get_users(included_only=True)
+        if not users:
+            logger.info("No included users, skipping GitHub fetch")
+            return
+        
         today = datetime.now(self.config.get_timezone()).date()
+        coverage = self.database.get_fetch_coverage()
         
         logger.info(f"Fetching PRs for {len(users)} users from {start_date} to {end_date}")
         
+        all_dates = set(dates_in_range(start_date, end_date))
+        # Always fetch today's data, only fetch historical if not cached
+        always_fetch = {today} & all_dates
+        
+        users_to_fetch = []
+        fetch_start = None
+        fetch_end = None
+        
         for user in users:
             logger.debug(f"Processing user: {user['login']}")
             
@@ -94,88 +106,119 @@ class PRMonitoringSystem:
             cached_dates = set(self.database.get_cached_dates_for_user(user['id']))
             
             # Determine which dates need fetching
-            dates_to_fetch = []
-            current_date = start_date
+            dates_to_fetch = (all_dates - cached_dates) | always_fetch
             
-            while current_date <= end_date:
-                # Always fetch today's data, only fetch historical if not cached
-                if current_date == today or current_date not in cached_dates:
-                    dates_to_fetch.append(current_date)
-                current_date += timedelta(days=1)
+            if incremental and user['login'] in coverage:
+                covered_from, covered_until = coverage[user['login']]
+                dates_to_fetch = {d for d in dates_to_fetch if not covered_from <= d < covered_until}
             
             if not dates_to_fetch:
                 logger.debug(f"All data cached for {user['login']}")
                 continue
             
-            # Fetch PRs for needed dates
-            fetch_start = min(dates_to_fetch)
-            fetch_end = max(dates_to_fetch)
+            # A single search covers the union of missing dates across users
+            users_to_fetch.append(user)
+            fetch_start = min(dates_to_fetch) if fetch_start is None else min(fetch_start, min(dates_to_fetch))
+            fetch_end = max(dates_to_fetch) if fetch_end is None else max(fetch_end, max(dates_to_fetch))
+        
+        if not users_to_fetch:
+            logger.info("All data cached, skipping GitHub fetch")
+            return
+        
+        logger.debug(f"Fetching PRs for {len(users_to_fetch)} users from {fetch_start} to {fetch_end}")
+        
+        # Today's PRs may still grow, so coverage never extends past the last complete UTC day
+        covered_until = min(fetch_end + timedelta(days=1), datetime.now(timezone.utc).date())
+        
+        try:
+            raw_prs_by_login, truncated_logins = self.github_client.get_team_pull_requests(
+                [user['login'] for user in users_to_fetch], fetch_start, fetch_end
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch PRs: {e}")
+            return
+        
+        # Convert PRs and route them to their authors
+        processed_prs = []
+        fetched_coverage = {}
+        for user in users_to_fetch:
+            raw_prs = raw_prs_by_login.get(user['login'])
+            if raw_prs is None:
+                logger.warning(f"Failed to fetch PRs for {user['login']}")
+                continue
             
-            logger.debug(f"Fetching PRs for {user['login']} from {fetch_start} to {fetch_end}")
+            if user['login'] in truncated_logins:
+                # Store what was returned, but leave the dates open for the next run
+                logger.warning(f"PRs for {user['login']} were truncated by the search result limit")
+            elif fetch_start < covered_until:
+                covered = (fetch_start, covered_until)
+                if user['login'] in coverage:
+                    previous_from, previous_until = coverage[user['login']]
+                    # Merge with the previous window unless there is a gap between them
+                    if previous_from <= covered_until and fetch_start <= previous_until:
+                        covered = (min(previous_from, fetch_start), max(previous_until, covered_until))
+                fetched_coverage[user['login']] = covered
             
-            try:
-                raw_prs = self.github_client.get_user_pull_requests(
-                    user['login'], fetch_start, fetch_end
-                )
-                
-                # Convert and store PRs
-                processed_prs = []
-                for pr in raw_prs:
-                    # Convert to local timezone
-                    local_dt = self.analyzer.convert_to_local_timezone(pr['created_at_utc'])
-                    local_date = local_dt.date()
-                    
-                    processed_prs.append({
-                        'pr_id': pr['id'],
-                        'user_id': user['id'],
-                        'repository': pr['repository'],
-                        'title': pr['title'],
-                        'timestamp_utc': pr['created_at_utc'].isoformat(),
-                        'timestamp_local': local_dt.isoformat(),
-                        'date_local': local_date
-                    })
+            for pr in raw_prs:
+                # Convert to local timezone
+                local_dt = self.analyzer.convert_to_local_timezone(pr['created_at_utc'])
+                local_date = local_dt.date()
                 
-                if processed_prs:
-                    self.database.insert_pull_requests(processed_prs)
-                
-                logger.debug(f"Cached {len(processed_prs)} PRs for {user['login']}")
-                
-            except Exception as e:
-                logger.error(f"Failed to fetch PRs for {user['login']}: {e}")
-                continue
+                processed_prs.append({
+                    'pr_id': pr['id'],
+                    'user_id': user['id'],
+                    'repository': pr['repository'],
+                    'title': pr['title'],
+                    'timestamp_utc': pr['created_at_utc'].isoformat(),
+                    'timestamp_local': local_dt.isoformat(),
+                    'date_local': local_date
+                })
+            
+            logger.debug(f"Fetched {len(raw_prs)} PRs for {user['login']}")
+        
+        if processed_prs:
+            self.database.insert_pull_requests(processed_prs)
+            self.database.update_statistics()
+        
+        self.database.set_fetch_coverage(fetched_coverage)
     
     def analyze_and_store_daily_activity(self, start_date: date, end_date: date):
         """Analyze daily activity and store results"""
-        users = self.database.get_users(included_only=True)
+        logger.info(f"Analyzing daily activity from {start_date} to {end_date}")
+        
+        # Per-day in-time/outside-time counts are aggregated by SQLite for all users at once
+        daily_counts = self.database.get_daily_pr_counts(
+            start_date, end_date, self.analyzer.work_start_hour, self.analyzer.work_end_hour
+        )
         
-        logger.info(f"Analyzing daily activity for {len(users)} users")
+        self.database.upsert_daily_activities([
+            (user_id, activity_date, self.analyzer.classify_counts(count_in_time, count_outside_time),
+             count_in_time, count_outside_time)
+            for user_id, activity_date, count_in_time, count_outside_time in daily_counts
+        ])
         
-        for user in users:
-            # Get PRs for user in date range
+        # Summaries are aggregated from the stored daily activity in a single statement
+        self.database.recompute_summaries(start_date, end_date)
+        
+        logger.info("Daily activity analysis completed")
+    
+    def iter_detailed_activities(self, start_date: date, end_date: date) -> Iterator[Dict]:
+        """Yield each included user's daily activity with PR details, one user at a time"""
+        for user in self.database.get_users(included_only=True):
             user_prs = self.database.get_pull_requests_for_date_range(
                 user['id'], start_date, end_date
             )
+            # Daily states and counts are already stored, only the PR details are needed here
+            prs_by_date = self.analyzer.enrich_pull_requests(user_prs)
             
-            # Analyze daily activity
-            daily_activities = self.analyzer.analyze_user_activity(
-                user_prs, start_date, end_date
-            )
-            
-            # Store daily activity results
-            for activity in daily_activities:
-                self.database.upsert_daily_activity(
-                    user['id'],
-                    activity['date'],
-                    activity['state'],
-                    activity['count_in_time'],
-                    activity['count_outside_time']
-                )
-            
-            # Generate and store summary
-            summary = self.analyzer.generate_user_summary(daily_activities)
-            self.database.upsert_summary(user['id'], start_date, end_date, summary)
-        
-        logger.info("Daily activity analysis completed")
+            for current_date in dates_in_range(start_date, end_date):
+                yield {
+                    'date': current_date,
+                    'prs': prs_by_date.get(current_date, []),
+                    'login': user['login'],
+                    'name': user['name'],
+                    'email': user['email']
+                }
     
     def generate_reports(self, start_date: date, end_date: date, output_prefix: str = "pr_report"):
         """Generate all reports"""
@@ -186,46 +229,28 @@ class PRMonitoringSystem:
         summaries = self.database.get_summaries(start_date, end_date)
         users = self.database.get_users(included_only=False)
         
-        # Get detailed activity data with PR information
-        users_included = self.database.get_users(included_only=True)
-        detailed_activities = []
-        
-        for user in users_included:
-            user_prs = self.database.get_pull_requests_for_date_range(
-                user['id'], start_date, end_date
-            )
-            user_daily_activities = self.analyzer.analyze_user_activity(
-                user_prs, start_date, end_date
-            )
-            
-            # Add user info to activities
-            for activity in user_daily_activities:
-                activity.update({
-                    'login': user['login'],
-                    'name': user['name'],
-                    'email': user['email']
-                })
-                detailed_activities.append(activity)
+        # Detailed activity data with PR information is produced user by user while writing
+        detailed_activities = self.iter_detailed_activities(start_date, end_date)
         
         # Generate reports
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Daily activity report
-        daily_csv = self.report_generator.generate_daily_activity_csv(daily_activities)
-        self.report_generator.save_report_to_file(
-            daily_csv, f"{output_prefix}_daily_{timestamp}.csv"
+        self.report_generator.write_report_to_file(
+            f"{output_prefix}_daily_{timestamp}.csv",
+            self.report_generator.write_daily_activity_csv, daily_activities
         )
         
         # Detailed PRs report with timestamps
-        detailed_csv = self.report_generator.generate_detailed_prs_csv(detailed_activities)
-        self.report_generator.save_report_to_file(
-            detailed_csv, f"{output_prefix}_detailed_{timestamp}.csv"
+        self.report_generator.write_report_to_file(
+            f"{output_prefix}_detailed_{timestamp}.csv",
+            self.report_generator.write_detailed_prs_csv, detailed_activities
         )
         
         # Summary report
-        summary_csv = self.report_generator.generate_summary_csv(summaries)
-        self.report_generator.save_report_to_file(
-            summary_csv, f"{output_prefix}_summary_{timestamp}.csv"
+        self.report_generator.write_report_to_file(
+            f"{output_prefix}_summary_{timestamp}.csv",
+            self.report_generator.write_summary_csv, summaries
         )
         
         # User metadata report
@@ -236,12 +261,11 @@ class PRMonitoringSystem:
         included_users = [u for u in users if u.get('included', True)]
         excluded_users = [u for u in users if not u.get('included', True)]
         
-        metadata_csv = self.report_generator.generate_user_metadata_csv(
+        self.report_generator.write_report_to_file(
+            f"{output_prefix}_users_{timestamp}.csv",
+            self.report_generator.write_user_metadata_csv,
             users, len(included_users), len(excluded_users), filter_info
         )
-        self.report_generator.save_report_to_file(
-            metadata_csv, f"{output_prefix}_users_{timestamp}.csv"
-        )
         
         # JSON report with all data
         json_data = {
@@ -250,15 +274,18 @@ class PRMonitoringSystem:
                 'timezone': self.config.PROJECT_TIMEZONE,
                 'working_hours': f"{self.config.WORK_START_HOUR}:00-{self.config.WORK_END_HOUR}:00"
             },
-            'daily_activities': daily_activities,
+            'daily_activities': [
+                {**activity, 'state': STATE_LABELS[activity['state']]}
+                for activity in daily_activities
+            ],
             'summaries': summaries,
             'users': users,
             'generated_at': datetime.now().isoformat()
         }
         
-        json_report = self.report_generator.generate_json_report(json_data)
-        self.report_generator.save_report_to_file(
-            json_report, f"{output_prefix}_full_{timestamp}.json"
+        self.report_generator.write_report_to_file(
+            f"{output_prefix}_full_{timestamp}.json",
+            self.report_generator.write_json_report, json_data
         )
         
         # Print summary to console
@@ -266,21 +293,25 @@ class PRMonitoringSystem:
         
         logger.info("All reports generated successfully")
     
-    def run_full_analysis(self, start_date: date, end_date: date, output_prefix: str = "pr_report"):
+    def run_full_analysis(self, start_date: date, end_date: date, output_prefix: str = "pr_report",
+                          incremental: bool = False):
         """Run complete analysis pipeline"""
         logger.info(f"Starting PR monitoring analysis for {start_date} to {end_date}")
         
-        # Step 1: Fetch and store users
-        user_stats = self.fetch_and_store_users()
-        
-        # Step 2: Fetch and cache pull requests
-        self.fetch_and_cache_pull_requests(start_date, end_date)
-        
-        # Step 3: Analyze daily activity
-        self.analyze_and_store_daily_activity(start_date, end_date)
-        
-        # Step 4: Generate reports
-        self.generate_reports(start_date, end_date, output_prefix)
+        try:
+            # Step 1: Fetch and store users
+            user_stats = self.fetch_and_store_users()
+            
+            # Step 2: Fetch and cache pull requests
+            self.fetch_and_cache_pull_requests(start_date, end_date, incremental)
+            
+            # Step 3: Analyze daily activity
+            self.analyze_and_store_daily_activity(start_date, end_date)
+            
+            # Step 4: Generate reports
+            self.generate_reports(start_date, end_date, output_prefix)
+        finally:
+            self.database.close()
         
         logger.info("PR monitoring analysis completed successfully")
 
@@ -305,6 +336,11 @@ def main():
         default="pr_report",
         help="Output file prefix, default: pr_report"
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch PRs created since the previous run for each user"
+    )
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -331,7 +367,7 @@ def main():
     try:
         # Initialize and run system
         system = PRMonitoringSystem()
-        system.run_full_analysis(start_date, end_date, args.output_prefix)
+        system.run_full_analysis(start_date, end_date, args.output_prefix, args.incremental)
         return 0
         
     except Exception as e:
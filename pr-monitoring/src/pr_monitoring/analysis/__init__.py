@@ -2,39 +2,57 @@
 Analysis engine for classifying PR activity and generating reports
 """
 import logging
-from datetime import datetime, date, time, timedelta
-from typing import List, Dict, Tuple
-import pytz
+from collections import Counter
+from enum import IntEnum
+from datetime import datetime, date, time, timedelta, timezone, tzinfo
+from typing import List, Dict, Iterable, Tuple
 
 logger = logging.getLogger(__name__)
 
-class ActivityState:
-    """PR Activity state constants"""
-    NOT_SENT = "Not Sent"
-    SENT_IN_TIME = "Sent In Time" 
-    SENT_OUTSIDE_TIME = "Sent Outside Time"
+def dates_in_range(start_date: date, end_date: date) -> List[date]:
+    """All dates from start_date to end_date inclusive"""
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+class ActivityState(IntEnum):
+    """PR Activity states, stored as integers"""
+    NOT_SENT = 0
+    SENT_IN_TIME = 1
+    SENT_OUTSIDE_TIME = 2
+    
+    @property
+    def label(self) -> str:
+        """Human readable state name"""
+        return STATE_LABELS[self]
+
+# Report labels indexed by state value
+STATE_LABELS = ("Not Sent", "Sent In Time", "Sent Outside Time")
 
 class PRAnalyzer:
     """Analyze PR activity and classify by working hours"""
     
-    def __init__(self, timezone: pytz.timezone, work_start_hour: int, work_end_hour: int):
+    def __init__(self, timezone: tzinfo, work_start_hour: int, work_end_hour: int):
         self.timezone = timezone
         self.work_start_hour = work_start_hour
         self.work_end_hour = work_end_hour
+        # Working hours lookup indexed by hour of day
+        self._hour_mask = tuple(work_start_hour <= hour < work_end_hour for hour in range(24))
+        self._is_utc = str(timezone) == 'UTC'
         
     def convert_to_local_timezone(self, utc_datetime: datetime) -> datetime:
         """Convert UTC datetime to configured timezone"""
         if utc_datetime.tzinfo is None:
-            utc_datetime = pytz.utc.localize(utc_datetime)
+            utc_datetime = utc_datetime.replace(tzinfo=timezone.utc)
+        elif self._is_utc and utc_datetime.utcoffset() == timedelta(0):
+            # Already expressed in the target zone
+            return utc_datetime
         
         return utc_datetime.astimezone(self.timezone)
     
     def is_within_working_hours(self, local_datetime: datetime) -> bool:
         """Check if datetime falls within working hours"""
-        hour = local_datetime.hour
-        return self.work_start_hour <= hour < self.work_end_hour
+        return self._hour_mask[local_datetime.hour]
     
-    def classify_daily_activity(self, prs_for_date: List[Dict]) -> Tuple[str, int, int]:
+    def classify_daily_activity(self, prs_for_date: List[Dict]) -> Tuple[ActivityState, int, int]:
         """
         Classify PR activity for a single date
         Returns: (state, count_in_time, count_outside_time)
@@ -57,83 +75,74 @@ class PRAnalyzer:
             else:
                 count_outside_time += 1
         
-        # Determine state based on counts
+        return self.classify_counts(count_in_time, count_outside_time), count_in_time, count_outside_time
+    
+    @staticmethod
+    def classify_counts(count_in_time: int, count_outside_time: int) -> ActivityState:
+        """Determine activity state from in-time and outside-time PR counts"""
         if count_in_time > 0:
-            return ActivityState.SENT_IN_TIME, count_in_time, count_outside_time
-        else:
-            return ActivityState.SENT_OUTSIDE_TIME, count_in_time, count_outside_time
+            return ActivityState.SENT_IN_TIME
+        if count_outside_time > 0:
+            return ActivityState.SENT_OUTSIDE_TIME
+        return ActivityState.NOT_SENT
     
-    def analyze_user_activity(self, user_prs: List[Dict], start_date: date, end_date: date) -> List[Dict]:
+    def enrich_pull_requests(self, user_prs: List[Dict]) -> Dict[date, List[Dict]]:
         """
-        Analyze PR activity for a user across a date range
-        Returns list of daily activity records
+        Add formatted times and working hours classification to PRs for reporting
+        Returns enriched PRs grouped by local date
         """
-        # Group PRs by date
         prs_by_date = {}
         for pr in user_prs:
-            pr_date = datetime.fromisoformat(pr['date_local']).date()
-            if pr_date not in prs_by_date:
-                prs_by_date[pr_date] = []
-            
-            # Enrich PR data with formatted times and classification
-            local_dt = datetime.fromisoformat(pr['timestamp_local'])
-            utc_dt = datetime.fromisoformat(pr['timestamp_utc'])
-            is_in_working_hours = self.is_within_working_hours(local_dt)
+            # Timestamps come back from the database as datetime objects
+            local_dt = pr['timestamp_local']
+            utc_dt = pr['timestamp_utc']
             
             enriched_pr = {
                 **pr,
                 'created_at_lima': local_dt.strftime('%Y-%m-%d %H:%M:%S'),
                 'created_at_utc': utc_dt.strftime('%Y-%m-%d %H:%M:%S'),
-                'is_in_working_hours': is_in_working_hours
+                'is_in_working_hours': self.is_within_working_hours(local_dt)
             }
             
-            prs_by_date[pr_date].append(enriched_pr)
+            # timestamp_local carries the local date, no need to parse date_local separately
+            prs_by_date.setdefault(local_dt.date(), []).append(enriched_pr)
+        
+        return prs_by_date
+    
+    def analyze_user_activity(self, user_prs: List[Dict], start_date: date, end_date: date) -> List[Dict]:
+        """
+        Analyze PR activity for a user across a date range
+        Returns list of daily activity records
+        """
+        prs_by_date = self.enrich_pull_requests(user_prs)
         
         # Analyze each date in range
         daily_activities = []
-        current_date = start_date
-        
-        while current_date <= end_date:
+        for current_date in dates_in_range(start_date, end_date):
             prs_for_date = prs_by_date.get(current_date, [])
-            state, count_in_time, count_outside_time = self.classify_daily_activity(prs_for_date)
+            count_in_time = sum(pr['is_in_working_hours'] for pr in prs_for_date)
+            count_outside_time = len(prs_for_date) - count_in_time
             
             daily_activities.append({
                 'date': current_date,
-                'state': state,
+                'state': self.classify_counts(count_in_time, count_outside_time),
                 'count_in_time': count_in_time,
                 'count_outside_time': count_outside_time,
                 'prs': prs_for_date
             })
-            
-            current_date += timedelta(days=1)
         
         return daily_activities
     
     def generate_user_summary(self, daily_activities: List[Dict]) -> Dict:
         """Generate summary statistics for a user"""
-        total_days_in_time = 0
-        total_days_outside_time = 0
-        total_days_not_sent = 0
-        total_prs_in_time = 0
-        total_prs_outside_time = 0
-        
-        for activity in daily_activities:
-            state = activity['state']
-            
-            if state == ActivityState.SENT_IN_TIME:
-                total_days_in_time += 1
-            elif state == ActivityState.SENT_OUTSIDE_TIME:
-                total_days_outside_time += 1
-            elif state == ActivityState.NOT_SENT:
-                total_days_not_sent += 1
-            
-            total_prs_in_time += activity['count_in_time']
-            total_prs_outside_time += activity['count_outside_time']
+        days_by_state = Counter(activity['state'] for activity in daily_activities)
+        total_prs_in_time = sum(activity['count_in_time'] for activity in daily_activities)
+        total_prs_outside_time = sum(activity['count_outside_time'] for activity in daily_activities)
         
         return {
-            'total_days_in_time': total_days_in_time,
-            'total_days_outside_time': total_days_outside_time, 
-            'total_days_not_sent': total_days_not_sent,
+            'total_days_in_time': days_by_state[ActivityState.SENT_IN_TIME],
+            'total_days_outside_time': days_by_state[ActivityState.SENT_OUTSIDE_TIME], 
+            'total_days_not_sent': days_by_state[ActivityState.NOT_SENT],
             'total_prs_in_time': total_prs_in_time,
             'total_prs_outside_time': total_prs_outside_time,
             'total_days': len(daily_activities),
@@ -143,9 +152,13 @@ class PRAnalyzer:
 class UserFilter:
     """Filter users based on exclusion lists and email patterns"""
     
-    def __init__(self, exclusion_list: List[str], email_prefix_filter: str = ""):
-        self.exclusion_list = set(exclusion_list)
+    def __init__(self, exclusion_list: Iterable[str], email_prefix_filter: str = ""):
+        # Config already provides a frozenset, only copy other iterables
+        self.exclusion_list = exclusion_list if isinstance(exclusion_list, frozenset) else frozenset(exclusion_list)
         self.email_prefix_filter = email_prefix_filter.strip()
+        
+        suffix = self.email_prefix_filter
+        self._email_matches = (lambda email: email.endswith(suffix)) if suffix else (lambda email: True)
     
     def should_include_user(self, user: Dict) -> bool:
         """Determine if user should be included in analysis"""
@@ -156,9 +169,5 @@ class UserFilter:
         if login in self.exclusion_list:
             return False
         
-        # Check email prefix filter (if configured)
-        if self.email_prefix_filter and email:
-            if not email.endswith(self.email_prefix_filter):
-                return False
-        
-        return True
\ No newline at end of file
+        # Check email prefix filter (if configured), users without an email are kept
+        return not email or self._email_matches(email)
\ No newline at end of file
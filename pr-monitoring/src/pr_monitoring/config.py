@@ -2,12 +2,18 @@
 Configuration management for PR Monitoring System
 """
 import os
-from typing import List, Optional
-import pytz
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@lru_cache(maxsize=None)
+def _load_timezone(name: str) -> ZoneInfo:
+    """Resolve a timezone name once and reuse the tzinfo object"""
+    return ZoneInfo(name)
+
 class Config:
     """Application configuration"""
     
@@ -24,23 +30,36 @@ class Config:
     WORK_END_HOUR: int = int(os.getenv('WORK_END_HOUR', '18'))
     
     # User Filtering
-    EXCLUSION_LIST: List[str] = [
+    EXCLUSION_LIST: FrozenSet[str] = frozenset(
         item.strip() for item in os.getenv('EXCLUSION_LIST', '').split(',')
         if item.strip()
-    ]
+    )
     EMAIL_PREFIX_FILTER: str = os.getenv('EMAIL_PREFIX_FILTER', '')
     
     # Database
     DATABASE_PATH: str = os.getenv('DATABASE_PATH', 'pr_monitoring.db')
+    SQLITE_TUNE: bool = os.getenv('SQLITE_TUNE', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Last validated settings and their errors, see validate()
+    _validation_cache: Optional[Tuple[Tuple, List[str]]] = None
     
     @classmethod
-    def get_timezone(cls) -> pytz.timezone:
+    def get_timezone(cls) -> ZoneInfo:
         """Get configured timezone object"""
-        return pytz.timezone(cls.PROJECT_TIMEZONE)
+        return _load_timezone(cls.PROJECT_TIMEZONE)
     
     @classmethod
     def validate(cls) -> List[str]:
         """Validate configuration and return list of errors"""
+        settings = (
+            cls.GITHUB_TOKEN, cls.GITHUB_ORGANIZATION, cls.GITHUB_TEAM,
+            cls.PROJECT_TIMEZONE, cls.WORK_START_HOUR, cls.WORK_END_HOUR
+        )
+        
+        # Settings rarely change after startup, so only re-validate when they do
+        if cls._validation_cache is not None and cls._validation_cache[0] == settings:
+            return list(cls._validation_cache[1])
+        
         errors = []
         
         if not cls.GITHUB_TOKEN:
@@ -54,7 +73,7 @@ class Config:
         
         try:
             cls.get_timezone()
-        except pytz.exceptions.UnknownTimeZoneError:
+        except (ZoneInfoNotFoundError, ValueError):
             errors.append(f"Invalid timezone: {cls.PROJECT_TIMEZONE}")
         
         if cls.WORK_START_HOUR < 0 or cls.WORK_START_HOUR > 23:
@@ -66,4 +85,5 @@ class Config:
         if cls.WORK_START_HOUR >= cls.WORK_END_HOUR:
             errors.append("WORK_START_HOUR must be less than WORK_END_HOUR")
         
-        return errors
\ No newline at end of file
+        cls._validation_cache = (settings, errors)
+        return list(errors)
\ No newline at end of file
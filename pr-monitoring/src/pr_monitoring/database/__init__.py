@@ -3,17 +3,96 @@ Database schema and operations for PR Monitoring System
 """
 import sqlite3
 import logging
+import threading
+from itertools import chain
 from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# DATE and TIMESTAMP columns are stored as ISO strings and read back as date/datetime
+# objects (connections use detect_types=PARSE_DECLTYPES, computed columns can opt in
+# with a "name [DATE]" alias through PARSE_COLNAMES)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+# Per-connection settings applied when tuning is enabled: relaxed syncing under WAL,
+# a 64 MiB page cache, in-memory temp tables and a 256 MiB memory map
+TUNING_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA cache_size=-65536;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA foreign_keys=ON;
+"""
+
+# Prepared statements kept per connection, keyed by SQL text; the default of 128 is
+# too small to hold the per-row statements alongside the schema and report queries
+STATEMENT_CACHE_SIZE = 256
+
+UPSERT_USER_SQL = """
+    INSERT INTO users (login, email, name, included_flag)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(login) DO UPDATE SET
+        email = COALESCE(excluded.email, email),
+        name = COALESCE(excluded.name, name),
+        included_flag = excluded.included_flag
+"""
+UPSERT_USER_RETURNING_ID_SQL = UPSERT_USER_SQL + "RETURNING id\n"
+
+# Pull requests are inserted 64 rows per statement, keeping the 7 bound values per row
+# well under SQLite's historical limit of 999 variables per statement
+PR_INSERT_COLUMNS = "(pr_id, user_id, repository, title, timestamp_utc, timestamp_local, date_local)"
+PR_INSERT_CHUNK_ROWS = 64
+PR_INSERT_ROW_SQL = f"INSERT OR REPLACE INTO pull_requests {PR_INSERT_COLUMNS} VALUES (?, ?, ?, ?, ?, ?, ?)"
+PR_INSERT_CHUNK_SQL = (
+    f"INSERT OR REPLACE INTO pull_requests {PR_INSERT_COLUMNS} VALUES "
+    + ", ".join(["(?, ?, ?, ?, ?, ?, ?)"] * PR_INSERT_CHUNK_ROWS)
+)
+
+CACHED_DATES_FOR_USER_SQL = """
+    SELECT DISTINCT date_local
+    FROM pull_requests
+    WHERE user_id = ?
+    ORDER BY date_local
+"""
+
+UPSERT_DAILY_ACTIVITY_SQL = """
+    INSERT INTO daily_activity (user_id, date_local, state, count_in_time, count_outside_time)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, date_local) DO UPDATE SET
+        state = excluded.state,
+        count_in_time = excluded.count_in_time,
+        count_outside_time = excluded.count_outside_time
+"""
+
+UPSERT_SUMMARY_SQL = """
+    INSERT INTO summaries (
+        user_id, period_start, period_end,
+        total_days_in_time, total_days_outside_time, total_days_not_sent,
+        total_prs_in_time, total_prs_outside_time
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, period_start, period_end) DO UPDATE SET
+        total_days_in_time = excluded.total_days_in_time,
+        total_days_outside_time = excluded.total_days_outside_time,
+        total_days_not_sent = excluded.total_days_not_sent,
+        total_prs_in_time = excluded.total_prs_in_time,
+        total_prs_outside_time = excluded.total_prs_outside_time,
+        generated_at = CURRENT_TIMESTAMP
+"""
+
 class Database:
     """SQLite database operations"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, tune: bool = True):
         self.db_path = db_path
+        self.tune = tune
+        # One connection is reused for the lifetime of the instance so the file handle
+        # and page cache stay warm; the lock serializes access from worker threads
+        self._conn = None
+        self._lock = threading.RLock()
         self.init_database()
     
     def init_database(self):
@@ -21,6 +100,18 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Write-ahead logging is persistent, so it only needs to be set once per file
+            if self.tune:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                # SQLite keeps the previous mode when WAL isn't supported (e.g. in-memory databases)
+                journal_mode = cursor.fetchone()[0]
+                if journal_mode.lower() != 'wal':
+                    logger.warning(f"Could not enable WAL journaling, using '{journal_mode}' mode")
+            
+            # One explicit transaction so the state conversion below is all or nothing;
+            # sqlite3 doesn't open one implicitly for DDL
+            cursor.execute("BEGIN")
+            
             # Users table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -48,12 +139,21 @@ class Database:
                 )
             """)
             
-            # Daily activity table
+            # Databases created before states became integers are converted below; a
+            # daily_activity_text_states table left by an interrupted conversion is finished too
+            if self._has_text_activity_states(cursor):
+                cursor.execute("ALTER TABLE daily_activity RENAME TO daily_activity_text_states")
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_activity_text_states'"
+            )
+            migrate_states = cursor.fetchone() is not None
+            
+            # Daily activity table (state: 0 Not Sent, 1 Sent In Time, 2 Sent Outside Time)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS daily_activity (
                     user_id INTEGER NOT NULL,
                     date_local DATE NOT NULL,
-                    state TEXT NOT NULL CHECK (state IN ('Not Sent', 'Sent In Time', 'Sent Outside Time')),
+                    state INTEGER NOT NULL CHECK (state IN (0, 1, 2)),
                     count_in_time INTEGER NOT NULL DEFAULT 0,
                     count_outside_time INTEGER NOT NULL DEFAULT 0,
                     PRIMARY KEY (user_id, date_local),
@@ -87,26 +187,83 @@ class Database:
                 )
             """)
             
+            if migrate_states:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO daily_activity (user_id, date_local, state, count_in_time, count_outside_time)
+                    SELECT user_id, date_local,
+                           CASE state WHEN 'Sent In Time' THEN 1 WHEN 'Sent Outside Time' THEN 2 ELSE 0 END,
+                           count_in_time, count_outside_time
+                    FROM daily_activity_text_states
+                """)
+                cursor.execute("DROP TABLE daily_activity_text_states")
+                logger.info("Converted daily activity states to integers")
+            
             # Indexes for performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pr_user_date ON pull_requests (user_id, date_local)")
+            # Covers get_pull_requests_for_date_range and get_cached_dates_for_user without table lookups
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_pr_user_date_cover ON pull_requests (
+                    user_id, date_local, timestamp_local, timestamp_utc, repository, title, pr_id
+                )
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_pr_user_date")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_pr_date_local ON pull_requests (date_local)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_date ON daily_activity (date_local)")
+            # Covers get_daily_activity range scans without table lookups
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_activity_date_cover ON daily_activity (
+                    date_local, user_id, state, count_in_time, count_outside_time
+                )
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_activity_date")
             
             conn.commit()
             logger.info("Database initialized successfully")
     
+    @staticmethod
+    def _has_text_activity_states(cursor: sqlite3.Cursor) -> bool:
+        """Check whether daily_activity still stores states as text labels"""
+        cursor.execute("PRAGMA table_info(daily_activity)")
+        return any(row[1] == 'state' and row[2] == 'TEXT' for row in cursor.fetchall())
+    
+    def update_statistics(self):
+        """Refresh query planner statistics, running a full ANALYZE only the first time"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute("PRAGMA optimize")
+            else:
+                cursor.execute("ANALYZE")
+            
+            conn.commit()
+    
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            yield conn
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Database error: {e}")
-            raise
-        finally:
-            conn.close()
+        """Context manager for the shared database connection"""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(
+                    self.db_path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                    check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+                )
+                # Rows index like tuples and convert to dicts keyed by column name
+                self._conn.row_factory = sqlite3.Row
+                if self.tune:
+                    self._conn.executescript(TUNING_PRAGMAS)
+            
+            try:
+                yield self._conn
+            except Exception as e:
+                self._conn.rollback()
+                logger.error(f"Database error: {e}")
+                raise
+    
+    def close(self):
+        """Close the shared connection, a later call reopens it"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
     
     def upsert_user(self, login: str, email: Optional[str] = None, 
                    name: Optional[str] = None, included: bool = True) -> int:
@@ -114,21 +271,28 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO users (login, email, name, included_flag)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(login) DO UPDATE SET
-                    email = COALESCE(excluded.email, email),
-                    name = COALESCE(excluded.name, name),
-                    included_flag = excluded.included_flag
-            """, (login, email, name, included))
-            
-            cursor.execute("SELECT id FROM users WHERE login = ?", (login,))
+            cursor.execute(UPSERT_USER_RETURNING_ID_SQL, (login, email, name, included))
+            
             user_id = cursor.fetchone()[0]
             conn.commit()
             
             return user_id
     
+    def upsert_users(self, users: List[Tuple[str, Optional[str], Optional[str], bool]]):
+        """
+        Bulk insert or update users in a single transaction
+        Each row is (login, email, name, included)
+        """
+        if not users:
+            return
+            
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.executemany(UPSERT_USER_SQL, users)
+            
+            conn.commit()
+    
     def get_users(self, included_only: bool = True) -> List[Dict]:
         """Get users from database"""
         with self.get_connection() as conn:
@@ -140,30 +304,48 @@ class Database:
             
             cursor.execute(query)
             
-            return [
-                {"id": row[0], "login": row[1], "email": row[2], "name": row[3]}
-                for row in cursor.fetchall()
-            ]
+            return [dict(row) for row in cursor]
     
     def insert_pull_requests(self, prs: List[Dict]):
         """Bulk insert pull requests"""
         if not prs:
             return
             
+        rows = [
+            (pr['pr_id'], pr['user_id'], pr['repository'], pr['title'],
+             pr['timestamp_utc'], pr['timestamp_local'], pr['date_local'])
+            for pr in prs
+        ]
+        chunked_end = len(rows) - len(rows) % PR_INSERT_CHUNK_ROWS
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.executemany("""
-                INSERT OR REPLACE INTO pull_requests 
-                (pr_id, user_id, repository, title, timestamp_utc, timestamp_local, date_local)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, [
-                (pr['pr_id'], pr['user_id'], pr['repository'], pr['title'],
-                 pr['timestamp_utc'], pr['timestamp_local'], pr['date_local'])
-                for pr in prs
-            ])
+            # user_id values come from stored users, so skip the per-row parent lookups;
+            # the pragma is ignored inside a transaction so it is toggled around it
+            if self.tune:
+                cursor.execute("PRAGMA foreign_keys=OFF")
+            
+            try:
+                if not conn.in_transaction:
+                    cursor.execute("BEGIN")
+                
+                # Full chunks go in as multi-row statements, the remainder row by row
+                for start in range(0, chunked_end, PR_INSERT_CHUNK_ROWS):
+                    cursor.execute(PR_INSERT_CHUNK_SQL, list(
+                        chain.from_iterable(rows[start:start + PR_INSERT_CHUNK_ROWS])
+                    ))
+                
+                cursor.executemany(PR_INSERT_ROW_SQL, rows[chunked_end:])
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                if self.tune:
+                    cursor.execute("PRAGMA foreign_keys=ON")
             
-            conn.commit()
             logger.info(f"Inserted {len(prs)} pull requests")
     
     def get_cached_dates_for_user(self, user_id: int) -> List[date]:
@@ -171,14 +353,47 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT DISTINCT date_local 
-                FROM pull_requests 
-                WHERE user_id = ?
-                ORDER BY date_local
-            """, (user_id,))
+            cursor.execute(CACHED_DATES_FOR_USER_SQL, (user_id,))
+            
+            return [row[0] for row in cursor.fetchall()]
+    
+    def get_fetch_coverage(self) -> Dict[str, Tuple[date, date]]:
+        """
+        Get the UTC creation date window fully fetched from GitHub for each login
+        Returns: {login: (covered_from, covered_until)} with covered_until exclusive
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT key, value FROM cache_metadata WHERE key LIKE 'pr_coverage:%'")
             
-            return [datetime.strptime(row[0], '%Y-%m-%d').date() for row in cursor.fetchall()]
+            coverage = {}
+            for key, value in cursor.fetchall():
+                covered_from, covered_until = value.split('..')
+                coverage[key[len('pr_coverage:'):]] = (
+                    date.fromisoformat(covered_from), date.fromisoformat(covered_until)
+                )
+            return coverage
+    
+    def set_fetch_coverage(self, coverage: Dict[str, Tuple[date, date]]):
+        """Store fetched UTC creation date windows, see get_fetch_coverage"""
+        if not coverage:
+            return
+            
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.executemany("""
+                INSERT INTO cache_metadata (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [
+                (f"pr_coverage:{login}", f"{covered_from.isoformat()}..{covered_until.isoformat()}")
+                for login, (covered_from, covered_until) in coverage.items()
+            ])
+            
+            conn.commit()
     
     def get_pull_requests_for_date_range(self, user_id: int, start_date: date, end_date: date) -> List[Dict]:
         """Get pull requests for user within date range"""
@@ -192,32 +407,70 @@ class Database:
                 ORDER BY timestamp_local
             """, (user_id, start_date.isoformat(), end_date.isoformat()))
             
-            return [
-                {
-                    "pr_id": row[0],
-                    "repository": row[1], 
-                    "title": row[2],
-                    "timestamp_utc": row[3],
-                    "timestamp_local": row[4],
-                    "date_local": row[5]
-                }
-                for row in cursor.fetchall()
-            ]
+            return [dict(row) for row in cursor]
+    
+    def get_daily_pr_counts(self, start_date: date, end_date: date,
+                            work_start_hour: int, work_end_hour: int) -> List[Tuple[int, date, int, int]]:
+        """
+        Aggregate PRs of included users per local date, one row for every date in range
+        Returns: [(user_id, date_local, count_in_time, count_outside_time)]
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # The local hour is read straight from the ISO timestamp (YYYY-MM-DDTHH:...)
+            cursor.execute("""
+                WITH RECURSIVE dates(date_local) AS (
+                    SELECT date(:start_date)
+                    UNION ALL
+                    SELECT date(date_local, '+1 day') FROM dates WHERE date_local < date(:end_date)
+                )
+                SELECT u.id, d.date_local AS "date_local [DATE]",
+                       COALESCE(SUM(pr.in_time), 0),
+                       COUNT(pr.pr_id) - COALESCE(SUM(pr.in_time), 0)
+                FROM users u
+                CROSS JOIN dates d
+                LEFT JOIN (
+                    SELECT user_id, date_local, pr_id,
+                           CAST(substr(timestamp_local, 12, 2) AS INTEGER)
+                               BETWEEN :work_start_hour AND :work_end_hour - 1 AS in_time
+                    FROM pull_requests
+                    WHERE date_local BETWEEN :start_date AND :end_date
+                ) pr ON pr.user_id = u.id AND pr.date_local = d.date_local
+                WHERE u.included_flag = 1
+                GROUP BY u.id, d.date_local
+                ORDER BY u.id, d.date_local
+            """, {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "work_start_hour": work_start_hour,
+                "work_end_hour": work_end_hour
+            })
+            
+            return cursor.fetchall()
     
-    def upsert_daily_activity(self, user_id: int, date_local: date, state: str, 
+    def upsert_daily_activity(self, user_id: int, date_local: date, state: int, 
                             count_in_time: int, count_outside_time: int):
         """Insert or update daily activity"""
+        self.upsert_daily_activities([
+            (user_id, date_local, state, count_in_time, count_outside_time)
+        ])
+    
+    def upsert_daily_activities(self, activities: List[Tuple[int, date, int, int, int]]):
+        """
+        Bulk insert or update daily activity in a single transaction
+        Each row is (user_id, date_local, state, count_in_time, count_outside_time)
+        """
+        if not activities:
+            return
+            
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT INTO daily_activity (user_id, date_local, state, count_in_time, count_outside_time)
-                VALUES (?, ?, ?, ?, ?)
-                ON CONFLICT(user_id, date_local) DO UPDATE SET
-                    state = excluded.state,
-                    count_in_time = excluded.count_in_time,
-                    count_outside_time = excluded.count_outside_time
-            """, (user_id, date_local.isoformat(), state, count_in_time, count_outside_time))
+            cursor.executemany(UPSERT_DAILY_ACTIVITY_SQL, [
+                (user_id, date_local.isoformat(), state, count_in_time, count_outside_time)
+                for user_id, date_local, state, count_in_time, count_outside_time in activities
+            ])
             
             conn.commit()
     
@@ -227,7 +480,7 @@ class Database:
             cursor = conn.cursor()
             
             cursor.execute("""
-                SELECT u.login, u.email, u.name, da.date_local, da.state, 
+                SELECT u.login, u.email, u.name, da.date_local AS "date", da.state, 
                        da.count_in_time, da.count_outside_time
                 FROM daily_activity da
                 JOIN users u ON da.user_id = u.id
@@ -235,31 +488,52 @@ class Database:
                 ORDER BY u.login, da.date_local
             """, (start_date.isoformat(), end_date.isoformat()))
             
-            return [
-                {
-                    "login": row[0],
-                    "email": row[1],
-                    "name": row[2],
-                    "date": row[3],
-                    "state": row[4],
-                    "count_in_time": row[5],
-                    "count_outside_time": row[6]
-                }
-                for row in cursor.fetchall()
-            ]
+            return [dict(row) for row in cursor]
     
     def upsert_summary(self, user_id: int, period_start: date, period_end: date, 
                       summary_data: Dict):
         """Insert or update summary data"""
+        self.upsert_summaries(period_start, period_end, {user_id: summary_data})
+    
+    def upsert_summaries(self, period_start: date, period_end: date, summaries: Dict[int, Dict]):
+        """Bulk insert or update summary data for a period, keyed by user ID"""
+        if not summaries:
+            return
+            
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            cursor.executemany(UPSERT_SUMMARY_SQL, [
+                (
+                    user_id, period_start.isoformat(), period_end.isoformat(),
+                    summary_data['total_days_in_time'], summary_data['total_days_outside_time'],
+                    summary_data['total_days_not_sent'], summary_data['total_prs_in_time'],
+                    summary_data['total_prs_outside_time']
+                )
+                for user_id, summary_data in summaries.items()
+            ])
+            
+            conn.commit()
+    
+    def recompute_summaries(self, period_start: date, period_end: date):
+        """Aggregate stored daily activity of included users into period summaries"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # States: 0 Not Sent, 1 Sent In Time, 2 Sent Outside Time
             cursor.execute("""
                 INSERT INTO summaries (
-                    user_id, period_start, period_end, 
+                    user_id, period_start, period_end,
                     total_days_in_time, total_days_outside_time, total_days_not_sent,
                     total_prs_in_time, total_prs_outside_time
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                )
+                SELECT da.user_id, :period_start, :period_end,
+                       SUM(da.state = 1), SUM(da.state = 2), SUM(da.state = 0),
+                       SUM(da.count_in_time), SUM(da.count_outside_time)
+                FROM daily_activity da
+                JOIN users u ON da.user_id = u.id
+                WHERE u.included_flag = 1 AND da.date_local BETWEEN :period_start AND :period_end
+                GROUP BY da.user_id
                 ON CONFLICT(user_id, period_start, period_end) DO UPDATE SET
                     total_days_in_time = excluded.total_days_in_time,
                     total_days_outside_time = excluded.total_days_outside_time,
@@ -267,12 +541,7 @@ class Database:
                     total_prs_in_time = excluded.total_prs_in_time,
                     total_prs_outside_time = excluded.total_prs_outside_time,
                     generated_at = CURRENT_TIMESTAMP
-            """, (
-                user_id, period_start.isoformat(), period_end.isoformat(),
-                summary_data['total_days_in_time'], summary_data['total_days_outside_time'],
-                summary_data['total_days_not_sent'], summary_data['total_prs_in_time'],
-                summary_data['total_prs_outside_time']
-            ))
+            """, {"period_start": period_start.isoformat(), "period_end": period_end.isoformat()})
             
             conn.commit()
     
@@ -291,17 +560,4 @@ class Database:
                 ORDER BY u.login
             """, (period_start.isoformat(), period_end.isoformat()))
             
-            return [
-                {
-                    "login": row[0],
-                    "email": row[1],
-                    "name": row[2],
-                    "total_days_in_time": row[3],
-                    "total_days_outside_time": row[4],
-                    "total_days_not_sent": row[5],
-                    "total_prs_in_time": row[6],
-                    "total_prs_outside_time": row[7],
-                    "generated_at": row[8]
-                }
-                for row in cursor.fetchall()
-            ]
\ No newline at end of file
+            return [dict(row) for row in cursor]
\ No newline at end of file
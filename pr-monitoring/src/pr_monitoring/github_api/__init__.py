@@ -2,13 +2,61 @@
 GitHub API client for fetching users and pull requests
 """
 import requests
+from requests.adapters import HTTPAdapter
 import logging
-from datetime import datetime, date
-from typing import List, Dict, Optional
-import pytz
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional, installed with the "fast" extra
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# GitHub rejects search queries longer than 256 characters
+SEARCH_QUERY_MAX_LENGTH = 256
+# GitHub only returns the first 1000 results of a search
+SEARCH_RESULT_LIMIT = 1000
+# Upper bound on concurrent requests sent to GitHub
+MAX_CONCURRENT_REQUESTS = 16
+# Searches sent together as aliased fields of a single GraphQL request
+SEARCHES_PER_REQUEST = 5
+# Rate-limited requests are retried while the requested wait stays reasonable
+MAX_RETRIES = 3
+MAX_RETRY_DELAY_SECONDS = 60
+# Secondary rate limits may not say how long to wait, so back off exponentially from this
+RATE_LIMIT_BACKOFF_SECONDS = 15
+
+# A PR search over (authors, first creation date, last creation date)
+AuthorSearch = Tuple[List[str], date, date]
+
+PULL_REQUEST_SEARCH_FRAGMENT = """
+fragment PullRequestSearch on SearchResultItemConnection {
+    issueCount
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    nodes {
+        ... on PullRequest {
+            id
+            title
+            createdAt
+            author {
+                login
+            }
+            repository {
+                nameWithOwner
+            }
+        }
+    }
+}
+"""
+
 class GitHubAPIClient:
     """GitHub API client with GraphQL support"""
     
@@ -21,25 +69,92 @@ class GitHubAPIClient:
             'Content-Type': 'application/json',
             'User-Agent': 'PR-Monitoring-System/1.0.0'
         })
+        # Keep one pooled keep-alive connection per concurrent worker
+        adapter = HTTPAdapter(
+            pool_connections=MAX_CONCURRENT_REQUESTS, pool_maxsize=MAX_CONCURRENT_REQUESTS
+        )
+        self.session.mount('https://', adapter)
+        # Epoch seconds until which the primary rate limit is known to be exhausted
+        self._rate_limit_reset = 0.0
+        self._rate_limit_lock = threading.Lock()
     
     def _make_graphql_request(self, query: str, variables: Optional[Dict] = None) -> Dict:
         """Make GraphQL request to GitHub API"""
         payload = {'query': query}
         if variables:
             payload['variables'] = variables
+        # The session already sends the JSON Content-Type header
+        body = {'data': orjson.dumps(payload)} if orjson is not None else {'json': payload}
         
-        response = self.session.post(f"{self.base_url}/graphql", json=payload)
+        for attempt in range(MAX_RETRIES + 1):
+            self._wait_for_rate_limit()
+            response = self.session.post(f"{self.base_url}/graphql", **body)
+            self._record_rate_limit(response)
+            
+            if response.status_code not in (403, 429) or attempt == MAX_RETRIES:
+                break
+            
+            delay = self._get_retry_delay(response)
+            if delay is None and 'rate limit' in response.text.lower():
+                delay = RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt
+            if delay is None or delay > MAX_RETRY_DELAY_SECONDS:
+                break
+            
+            logger.warning(f"Rate limited by GitHub, retrying in {delay:.0f}s")
+            time.sleep(delay)
         
         if response.status_code != 200:
             raise Exception(f"GitHub API error: {response.status_code} - {response.text}")
         
-        data = response.json()
+        data = orjson.loads(response.content) if orjson is not None else response.json()
         
         if 'errors' in data:
             raise Exception(f"GraphQL errors: {data['errors']}")
         
         return data['data']
     
+    def _wait_for_rate_limit(self):
+        """Hold requests back while the rate limit is exhausted and resets soon enough"""
+        with self._rate_limit_lock:
+            delay = self._rate_limit_reset - time.time()
+        
+        if 0 < delay <= MAX_RETRY_DELAY_SECONDS:
+            logger.warning(f"GitHub rate limit exhausted, waiting {delay:.0f}s for reset")
+            time.sleep(delay)
+    
+    def _record_rate_limit(self, response: requests.Response):
+        """Remember when the rate limit resets once a response reports it exhausted"""
+        reset_at = response.headers.get('X-RateLimit-Reset')
+        if response.headers.get('X-RateLimit-Remaining') != '0' or reset_at is None:
+            return
+        
+        try:
+            reset_at = float(reset_at) + 1
+        except ValueError:
+            return
+        
+        with self._rate_limit_lock:
+            self._rate_limit_reset = max(self._rate_limit_reset, reset_at)
+    
+    @staticmethod
+    def _get_retry_delay(response: requests.Response) -> Optional[float]:
+        """Seconds to wait before retrying a rate-limited response, None if not rate limited"""
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                return None
+        
+        reset_at = response.headers.get('X-RateLimit-Reset')
+        if response.headers.get('X-RateLimit-Remaining') == '0' and reset_at is not None:
+            try:
+                return max(float(reset_at) - time.time(), 0) + 1
+            except ValueError:
+                return None
+        
+        return None
+    
     def get_team_members(self, organization: str, team: str) -> List[Dict]:
         """Get all members of a GitHub team"""
         query = """
@@ -85,69 +200,226 @@ class GitHubAPIClient:
     
     def get_user_pull_requests(self, username: str, start_date: date, end_date: date) -> List[Dict]:
         """Get pull requests for a user within date range"""
-        # Convert dates to ISO format for GitHub API
-        since = datetime.combine(start_date, datetime.min.time()).isoformat() + "Z"
-        until = datetime.combine(end_date, datetime.max.time()).isoformat() + "Z"
+        # The search filters by creation date server side, so only the range is downloaded
+        pull_requests, _ = self.get_team_pull_requests([username], start_date, end_date)
+        pull_requests = pull_requests.get(username, [])
         
-        query = """
-        query($username: String!, $cursor: String) {
-            user(login: $username) {
-                pullRequests(first: 100, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
-                    pageInfo {
-                        hasNextPage
-                        endCursor
-                    }
-                    nodes {
-                        id
-                        title
-                        createdAt
-                        repository {
-                            nameWithOwner
-                        }
-                    }
-                }
-            }
-        }
-        """
+        logger.debug(f"Fetched {len(pull_requests)} PRs for {username}")
+        return pull_requests
+    
+    @staticmethod
+    def _author_search_query(search: AuthorSearch) -> str:
+        """Build the search query string for PRs created by any of the authors within the range"""
+        usernames, start_date, end_date = search
+        # Newest first, so paging can stop once results fall before the range
+        base = f"type:pr created:{start_date.isoformat()}..{end_date.isoformat()} sort:created-desc"
+        return base + "".join(f" author:{username}" for username in usernames)
+    
+    def _build_author_searches(self, usernames: List[str], start_date: date,
+                               end_date: date) -> List[AuthorSearch]:
+        """Pack usernames into as few PR searches as the query length limit allows"""
+        base_length = len(self._author_search_query(([], start_date, end_date)))
         
+        searches = []
+        current_length = base_length
+        current_usernames = []
+        for username in usernames:
+            qualifier_length = len(f" author:{username}")
+            if current_usernames and current_length + qualifier_length > SEARCH_QUERY_MAX_LENGTH:
+                searches.append((current_usernames, start_date, end_date))
+                current_length = base_length
+                current_usernames = []
+            current_length += qualifier_length
+            current_usernames.append(username)
+        
+        if current_usernames:
+            searches.append((current_usernames, start_date, end_date))
+        
+        return searches
+    
+    @staticmethod
+    def _split_search(search: AuthorSearch) -> Optional[List[AuthorSearch]]:
+        """Halve a search by date range, or by authors for single-day searches; None if it can't be split"""
+        usernames, start_date, end_date = search
+        if start_date < end_date:
+            middle = start_date + (end_date - start_date) // 2
+            return [(usernames, start_date, middle), (usernames, middle + timedelta(days=1), end_date)]
+        if len(usernames) > 1:
+            middle = len(usernames) // 2
+            return [(usernames[:middle], start_date, end_date), (usernames[middle:], start_date, end_date)]
+        return None
+    
+    @staticmethod
+    def _isolate_searches(group: List[AuthorSearch]) -> Optional[List[List[AuthorSearch]]]:
+        """Break a failed group into one search per request, or one author per search; None if it's a single author"""
+        if len(group) > 1:
+            return [[search] for search in group]
+        usernames, start_date, end_date = group[0]
+        if len(usernames) > 1:
+            return [[([username], start_date, end_date)] for username in usernames]
+        return None
+    
+    def _search_pull_requests(self, searches: List[AuthorSearch], logins: Dict[str, str]
+                              ) -> Tuple[List[Tuple[str, Dict]], List[AuthorSearch], List[str]]:
+        """
+        Page through PR searches sent as aliased fields of one GraphQL request
+        Searches matching more PRs than GitHub returns are abandoned so they can be split
+        Returns: ([(username, pr)], [oversized searches], [usernames with truncated results])
+        """
         pull_requests = []
-        cursor = None
+        oversized = []
+        truncated = []
+        # Cursors of the searches that still have pages left, keyed by position
+        cursors = {index: None for index in range(len(searches))}
         
-        while True:
-            variables = {
-                "username": username,
-                "cursor": cursor
-            }
-            
-            try:
-                data = self._make_graphql_request(query, variables)
-            except Exception as e:
-                logger.warning(f"Failed to fetch PRs for {username}: {e}")
-                break
+        while cursors:
+            declarations = []
+            fields = []
+            variables = {}
+            for index, cursor in cursors.items():
+                declarations.append(f"$searchQuery{index}: String!, $cursor{index}: String")
+                fields.append(
+                    f"search{index}: search(query: $searchQuery{index}, type: ISSUE, "
+                    f"first: 100, after: $cursor{index}) {{ ...PullRequestSearch }}"
+                )
+                variables[f"searchQuery{index}"] = self._author_search_query(searches[index])
+                variables[f"cursor{index}"] = cursor
             
-            if not data['user']:
-                logger.warning(f"User '{username}' not found")
-                break
-            
-            pr_data = data['user']['pullRequests']
+            query = (
+                f"query({', '.join(declarations)}) {{\n    " + "\n    ".join(fields) + "\n}\n"
+                + PULL_REQUEST_SEARCH_FRAGMENT
+            )
+            data = self._make_graphql_request(query, variables)
             
-            # Filter PRs by date range (API may return slightly outside range)
-            for pr in pr_data['nodes']:
-                created_at = datetime.fromisoformat(pr['createdAt'].replace('Z', '+00:00'))
-                pr_date = created_at.date()
+            next_cursors = {}
+            for index, cursor in cursors.items():
+                search_data = data[f"search{index}"]
+                
+                if cursor is None and search_data['issueCount'] > SEARCH_RESULT_LIMIT:
+                    if self._split_search(searches[index]) is not None:
+                        oversized.append(searches[index])
+                        continue
+                    truncated.extend(searches[index][0])
+                    logger.warning(
+                        f"Search '{variables[f'searchQuery{index}']}' matched {search_data['issueCount']} PRs, "
+                        f"only the first {SEARCH_RESULT_LIMIT} will be fetched"
+                    )
+                
+                # ISO dates compare correctly as strings, so the range check needs no parsing
+                _, start_date, end_date = searches[index]
+                start_iso = start_date.isoformat()
+                end_iso = end_date.isoformat()
                 
-                if start_date <= pr_date <= end_date:
-                    pull_requests.append({
+                # Filter PRs by date range (API may return slightly outside range)
+                reached_start = False
+                for pr in search_data['nodes']:
+                    if not pr or not pr.get('author'):
+                        continue
+                    
+                    created_at = pr['createdAt']
+                    if created_at[:10] < start_iso:
+                        # Results are sorted newest first, nothing later is in range
+                        reached_start = True
+                        break
+                    if created_at[:10] > end_iso:
+                        continue
+                    
+                    username = logins.get(pr['author']['login'].lower())
+                    if username is None:
+                        continue
+                    
+                    pull_requests.append((username, {
                         'id': pr['id'],
                         'title': pr['title'],
-                        'created_at_utc': created_at.replace(tzinfo=pytz.UTC),
+                        # fromisoformat reads the trailing 'Z' as timezone.utc
+                        'created_at_utc': datetime.fromisoformat(created_at),
                         'repository': pr['repository']['nameWithOwner']
-                    })
-            
-            if not pr_data['pageInfo']['hasNextPage']:
-                break
+                    }))
                 
-            cursor = pr_data['pageInfo']['endCursor']
+                if search_data['pageInfo']['hasNextPage'] and not reached_start:
+                    next_cursors[index] = search_data['pageInfo']['endCursor']
+            
+            cursors = next_cursors
         
-        logger.debug(f"Fetched {len(pull_requests)} PRs for {username}")
-        return pull_requests
\ No newline at end of file
+        return pull_requests, oversized, truncated
+    
+    def _fetch_searches(self, searches: List[AuthorSearch],
+                        logins: Dict[str, str]) -> Tuple[List[Tuple[str, Dict]], Set[str], Set[str]]:
+        """
+        Run searches, splitting any that exceed the search result limit until all results are fetched
+        A failed request is retried one search, then one author, at a time so a failure only
+        affects the users it belongs to
+        Returns: ([(username, pr)], {usernames whose results were still truncated}, {usernames that failed})
+        """
+        pull_requests = []
+        truncated = set()
+        failed = set()
+        pending = [searches[i:i + SEARCHES_PER_REQUEST] for i in range(0, len(searches), SEARCHES_PER_REQUEST)]
+        
+        while pending:
+            group = pending.pop(0)
+            
+            try:
+                found, oversized, group_truncated = self._search_pull_requests(group, logins)
+            except Exception as e:
+                group_queries = [self._author_search_query(search) for search in group]
+                retry = self._isolate_searches(group)
+                if retry is None:
+                    logger.warning(f"Failed to search PRs with {group_queries}: {e}")
+                    failed.update(group[0][0])
+                else:
+                    logger.warning(f"Failed to search PRs with {group_queries}, retrying them separately: {e}")
+                    pending.extend(retry)
+                continue
+            
+            pull_requests.extend(found)
+            truncated.update(group_truncated)
+            
+            split = []
+            for search in oversized:
+                logger.debug(f"Search '{self._author_search_query(search)}' exceeds the result limit, splitting it")
+                split.extend(self._split_search(search))
+            pending.extend(split[i:i + SEARCHES_PER_REQUEST] for i in range(0, len(split), SEARCHES_PER_REQUEST))
+        
+        return pull_requests, truncated, failed
+    
+    def get_team_pull_requests(self, usernames: List[str], start_date: date,
+                               end_date: date) -> Tuple[Dict[str, List[Dict]], Set[str]]:
+        """
+        Get pull requests for several users within date range using batched searches
+        Returns a dict mapping each username to its pull requests, and the usernames
+        whose results hit the search result limit and may be missing PRs; users whose
+        search failed are left out so that callers don't treat them as fetched
+        """
+        # Search results carry GitHub's canonical login casing
+        logins = {username.lower(): username for username in usernames}
+        pull_requests = {}
+        truncated = set()
+        
+        searches = self._build_author_searches(usernames, start_date, end_date)
+        if not searches:
+            return pull_requests, truncated
+        
+        # Several searches share each request, cutting round trips
+        groups = [
+            searches[i:i + SEARCHES_PER_REQUEST]
+            for i in range(0, len(searches), SEARCHES_PER_REQUEST)
+        ]
+        
+        # Requests are independent and network bound, so run them concurrently
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(groups))) as executor:
+            results = executor.map(lambda group: self._fetch_searches(group, logins), groups)
+            
+            for group, (batch, batch_truncated, batch_failed) in zip(groups, results):
+                for batch_usernames, _, _ in group:
+                    for username in batch_usernames:
+                        if username not in batch_failed:
+                            pull_requests[username] = []
+                for username, pr in batch:
+                    if username not in batch_failed:
+                        pull_requests[username].append(pr)
+                truncated.update(batch_truncated - batch_failed)
+        
+        total = sum(len(prs) for prs in pull_requests.values())
+        logger.debug(f"Fetched {total} PRs for {len(usernames)} users")
+        return pull_requests, truncated
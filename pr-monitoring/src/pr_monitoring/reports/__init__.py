@@ -5,44 +5,80 @@ import csv
 import json
 import logging
 from datetime import date
-from typing import List, Dict
+from operator import itemgetter
+from typing import List, Dict, Callable, Iterable, Iterator, TextIO
 from io import StringIO
 
+from pr_monitoring.analysis import STATE_LABELS
+
+try:
+    import orjson
+except ImportError:  # optional, installed with the "fast" extra
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Fixed report schemas: the column names double as the CSV headers and the
+# itemgetters pull a whole row out of a record in one C-level call.
+# csv.writer renders None as an empty field.
+DAILY_ACTIVITY_COLUMNS = (
+    'login', 'email', 'name', 'date', 'state',
+    'count_in_time', 'count_outside_time'
+)
+SUMMARY_COLUMNS = (
+    'login', 'email', 'name',
+    'total_days_in_time', 'total_days_outside_time', 'total_days_not_sent',
+    'total_prs_in_time', 'total_prs_outside_time'
+)
+_daily_activity_row = itemgetter(*DAILY_ACTIVITY_COLUMNS)
+_summary_row = itemgetter(*SUMMARY_COLUMNS)
+_summary_counts = itemgetter(*SUMMARY_COLUMNS[3:])
+
+# Reports are streamed to disk through a 1 MiB buffer to keep write syscalls few
+REPORT_WRITE_BUFFER_SIZE = 1 << 20
+
+def _detailed_pr_rows(daily_activities: Iterable[Dict]) -> Iterator[tuple]:
+    """Flatten PRs from all activities into detailed report rows"""
+    for activity in daily_activities:
+        login = activity['login']
+        name = activity.get('name', '')
+        activity_date = activity['date']
+        
+        if activity.get('prs'):
+            for pr in activity['prs']:
+                yield (
+                    login, name, activity_date,
+                    pr.get('title', ''),
+                    pr.get('repository', ''),
+                    pr.get('created_at_lima', ''),
+                    pr.get('created_at_utc', ''),
+                    pr.get('is_in_working_hours', False)
+                )
+        else:
+            # Include users with no PRs
+            yield (login, name, activity_date, 'No PRs', '', '', '', False)
+
 class ReportGenerator:
     """Generate various types of reports from analyzed data"""
     
     @staticmethod
-    def generate_daily_activity_csv(daily_activities: List[Dict]) -> str:
-        """Generate CSV report of daily activities"""
-        output = StringIO()
+    def write_daily_activity_csv(daily_activities: List[Dict], output: TextIO):
+        """Write CSV report of daily activities to an open text stream"""
         writer = csv.writer(output)
         
         # Headers
-        writer.writerow([
-            'login', 'email', 'name', 'date', 'state', 
-            'count_in_time', 'count_outside_time'
-        ])
+        writer.writerow(DAILY_ACTIVITY_COLUMNS)
         
         # Data rows
-        for activity in daily_activities:
-            writer.writerow([
-                activity['login'],
-                activity['email'] or '',
-                activity['name'] or '',
-                activity['date'],
-                activity['state'],
-                activity['count_in_time'],
-                activity['count_outside_time']
-            ])
-        
-        return output.getvalue()
+        writer.writerows(
+            (login, email, name, activity_date, STATE_LABELS[state], count_in_time, count_outside_time)
+            for login, email, name, activity_date, state, count_in_time, count_outside_time
+            in map(_daily_activity_row, daily_activities)
+        )
     
     @staticmethod
-    def generate_detailed_prs_csv(daily_activities: List[Dict]) -> str:
-        """Generate detailed CSV report with PR times and titles"""
-        output = StringIO()
+    def write_detailed_prs_csv(daily_activities: Iterable[Dict], output: TextIO):
+        """Write detailed CSV report with PR times and titles to an open text stream"""
         writer = csv.writer(output)
         
         # Headers
@@ -51,95 +87,98 @@ class ReportGenerator:
             'created_time_lima', 'created_time_utc', 'is_in_working_hours'
         ])
         
-        # Data rows - flatten PRs from all activities
-        for activity in daily_activities:
-            if 'prs' in activity and activity['prs']:
-                for pr in activity['prs']:
-                    writer.writerow([
-                        activity['login'],
-                        activity.get('name', ''),
-                        activity['date'],
-                        pr.get('title', ''),
-                        pr.get('repository', ''),
-                        pr.get('created_at_lima', ''),
-                        pr.get('created_at_utc', ''),
-                        pr.get('is_in_working_hours', False)
-                    ])
-            else:
-                # Include users with no PRs
-                writer.writerow([
-                    activity['login'],
-                    activity.get('name', ''),
-                    activity['date'],
-                    'No PRs',
-                    '',
-                    '',
-                    '',
-                    False
-                ])
-        
-        return output.getvalue()
-
+        # Data rows - a single writerows call keeps the loop inside the C writer
+        writer.writerows(_detailed_pr_rows(daily_activities))
+    
     @staticmethod
-    def generate_summary_csv(summaries: List[Dict]) -> str:
-        """Generate CSV report of user summaries"""
-        output = StringIO()
+    def write_summary_csv(summaries: List[Dict], output: TextIO):
+        """Write CSV report of user summaries to an open text stream"""
         writer = csv.writer(output)
         
         # Headers
-        writer.writerow([
-            'login', 'email', 'name',
-            'total_days_in_time', 'total_days_outside_time', 'total_days_not_sent',
-            'total_prs_in_time', 'total_prs_outside_time', 'generated_at'
-        ])
+        writer.writerow(SUMMARY_COLUMNS + ('generated_at',))
         
         # Data rows
-        for summary in summaries:
-            writer.writerow([
-                summary['login'],
-                summary['email'] or '',
-                summary['name'] or '',
-                summary['total_days_in_time'],
-                summary['total_days_outside_time'], 
-                summary['total_days_not_sent'],
-                summary['total_prs_in_time'],
-                summary['total_prs_outside_time'],
-                summary.get('generated_at', '')
-            ])
-        
-        return output.getvalue()
+        writer.writerows(
+            _summary_row(summary) + (summary.get('generated_at', ''),)
+            for summary in summaries
+        )
     
     @staticmethod
-    def generate_user_metadata_csv(users: List[Dict], included_count: int, 
-                                  excluded_count: int, filter_info: Dict) -> str:
-        """Generate CSV report of user metadata and filtering results"""
-        output = StringIO()
+    def write_user_metadata_csv(users: List[Dict], included_count: int, 
+                                excluded_count: int, filter_info: Dict, output: TextIO):
+        """Write CSV report of user metadata and filtering results to an open text stream"""
         writer = csv.writer(output)
         
-        # Summary information
-        writer.writerow(['# User Filtering Summary'])
-        writer.writerow(['Total users fetched', len(users)])
-        writer.writerow(['Included users', included_count])
-        writer.writerow(['Excluded users', excluded_count])
-        writer.writerow(['Exclusion list', ', '.join(filter_info.get('exclusion_list', []))])
-        writer.writerow(['Email filter', filter_info.get('email_prefix_filter', 'None')])
-        writer.writerow([])
+        # Summary information and user details header
+        writer.writerows((
+            ['# User Filtering Summary'],
+            ['Total users fetched', len(users)],
+            ['Included users', included_count],
+            ['Excluded users', excluded_count],
+            ['Exclusion list', ', '.join(sorted(filter_info.get('exclusion_list', [])))],
+            ['Email filter', filter_info.get('email_prefix_filter', 'None')],
+            [],
+            ['login', 'email', 'name', 'included']
+        ))
         
         # User details
-        writer.writerow(['login', 'email', 'name', 'included'])
-        for user in users:
-            writer.writerow([
+        writer.writerows(
+            [
                 user['login'],
                 user['email'] or '',
                 user['name'] or '',
                 'Yes' if user.get('included', True) else 'No'
-            ])
-        
+            ]
+            for user in users
+        )
+    
+    @staticmethod
+    def write_json_report(data: Dict, output: TextIO):
+        """Write JSON report with all data to an open text stream"""
+        if orjson is not None:
+            # orjson only renders whole documents, which is still faster than streaming json
+            output.write(ReportGenerator.generate_json_report(data))
+        else:
+            json.dump(data, output, indent=2, default=str)
+    
+    @staticmethod
+    def generate_daily_activity_csv(daily_activities: List[Dict]) -> str:
+        """Generate CSV report of daily activities"""
+        output = StringIO()
+        ReportGenerator.write_daily_activity_csv(daily_activities, output)
+        return output.getvalue()
+    
+    @staticmethod
+    def generate_detailed_prs_csv(daily_activities: List[Dict]) -> str:
+        """Generate detailed CSV report with PR times and titles"""
+        output = StringIO()
+        ReportGenerator.write_detailed_prs_csv(daily_activities, output)
+        return output.getvalue()
+
+    @staticmethod
+    def generate_summary_csv(summaries: List[Dict]) -> str:
+        """Generate CSV report of user summaries"""
+        output = StringIO()
+        ReportGenerator.write_summary_csv(summaries, output)
+        return output.getvalue()
+    
+    @staticmethod
+    def generate_user_metadata_csv(users: List[Dict], included_count: int, 
+                                  excluded_count: int, filter_info: Dict) -> str:
+        """Generate CSV report of user metadata and filtering results"""
+        output = StringIO()
+        ReportGenerator.write_user_metadata_csv(users, included_count, excluded_count, filter_info, output)
         return output.getvalue()
     
     @staticmethod
     def generate_json_report(data: Dict) -> str:
         """Generate JSON report with all data"""
+        if orjson is not None:
+            # Datetimes go through str() like the json fallback instead of orjson's RFC 3339 form
+            return orjson.dumps(
+                data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_PASSTHROUGH_DATETIME
+            ).decode()
         return json.dumps(data, indent=2, default=str)
     
     @staticmethod
@@ -149,6 +188,14 @@ class ReportGenerator:
             f.write(content)
         logger.info(f"Report saved to {filename}")
     
+    @staticmethod
+    def write_report_to_file(filename: str, write_report: Callable[..., None], *args):
+        """Stream a report straight to file using one of the write_* methods"""
+        # newline='' lets the csv module control line endings
+        with open(filename, 'w', encoding='utf-8', newline='', buffering=REPORT_WRITE_BUFFER_SIZE) as f:
+            write_report(*args, f)
+        logger.info(f"Report saved to {filename}")
+    
     @staticmethod
     def print_summary_to_console(summaries: List[Dict], start_date: date, end_date: date):
         """Print summary statistics to console"""
@@ -163,24 +210,17 @@ class ReportGenerator:
         print(f"{'User':<25} {'In Time':<8} {'Outside':<8} {'Not Sent':<8} {'Total PRs':<10}")
         print("-" * 60)
         
-        total_in_time = 0
-        total_outside = 0 
-        total_not_sent = 0
-        total_prs = 0
+        # Pull the counters out once; column totals are then plain C-level sums
+        rows = list(map(_summary_counts, summaries))
         
-        for summary in summaries:
+        for summary, (days_in_time, days_outside, days_not_sent, prs_in_time, prs_outside) in zip(summaries, rows):
             login = summary['login'][:24]  # Truncate long usernames
-            days_in_time = summary['total_days_in_time']
-            days_outside = summary['total_days_outside_time']
-            days_not_sent = summary['total_days_not_sent']
-            user_total_prs = summary['total_prs_in_time'] + summary['total_prs_outside_time']
+            user_total_prs = prs_in_time + prs_outside
             
             print(f"{login:<25} {days_in_time:<8} {days_outside:<8} {days_not_sent:<8} {user_total_prs:<10}")
-            
-            total_in_time += days_in_time
-            total_outside += days_outside
-            total_not_sent += days_not_sent
-            total_prs += user_total_prs
+        
+        total_in_time, total_outside, total_not_sent, total_prs_in_time, total_prs_outside = map(sum, zip(*rows))
+        total_prs = total_prs_in_time + total_prs_outside
         
         print("-" * 60)
         print(f"{'TOTAL':<25} {total_in_time:<8} {total_outside:<8} {total_not_sent:<8} {total_prs:<10}")